@@ -4,7 +4,7 @@ import logging.config
 import yaml
 from src.config import Config
 from src.data_processing import load_data_structured
-from src.rag_pipeline import initialize_rag_components, retrieve_relevant_ipc_hybrid, generate_answer_with_ollama
+from src.rag_pipeline import initialize_rag_components, retrieve_relevant_ipc_hybrid, generate_answer_with_ollama, has_cached_answer, start_ollama_warm_up
 
 # Set up logging
 with open("logging_config.yaml", "r") as f:
@@ -24,7 +24,7 @@ def main():
 
     # Load components with caching
     try:
-        structured_ipc_data, ipc_faiss_index, ipc_metadata, retrieval_model, re_ranker_model = initialize_rag_components()
+        structured_ipc_data, ipc_lookup, ipc_faiss_index, ipc_metadata, retrieval_model, get_re_ranker = initialize_rag_components()
     except Exception as e:
         logger.error(f"Failed to initialize RAG components: {e}")
         st.error(f"Error initializing application: {e}")
@@ -48,13 +48,17 @@ def main():
         with st.chat_message("assistant"):
             with st.spinner("Finding relevant IPC sections and generating response..."):
                 try:
+                    # Load the LLM while retrieval runs so generation does not wait on a cold model.
+                    if not has_cached_answer(user_query, Config.OLLAMA_MODEL):
+                        start_ollama_warm_up(Config.OLLAMA_MODEL)
                     retrieved_sections = retrieve_relevant_ipc_hybrid(
                         user_query,
                         structured_ipc_data,
+                        ipc_lookup,
                         ipc_faiss_index,
                         ipc_metadata,
                         retrieval_model,
-                        re_ranker_model,
+                        get_re_ranker,
                         Config.K_INITIAL_RETRIEVAL,
                         Config.K_FINAL_RE_RANKED
                     )
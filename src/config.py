@@ -6,10 +6,27 @@ load_dotenv()
 class Config:
     """Configuration class for IPC Legal Chatbot."""
     DATA_FILE = os.getenv("DATA_FILE", "data/legal_data.jsonl")
+    STRUCTURED_DATA_CACHE_PATH = os.getenv("STRUCTURED_DATA_CACHE_PATH", f"{DATA_FILE}.pkl")
     EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
     RE_RANKER_MODEL_NAME = os.getenv("RE_RANKER_MODEL_NAME", "cross-encoder/ms-marco-MiniLM-L-6-v2")
     VECTOR_DB_PATH = os.getenv("VECTOR_DB_PATH", "data/ipc_faiss.index")
     METADATA_PATH = os.getenv("METADATA_PATH", "data/ipc_metadata.json")
+    MODEL_BACKEND = os.getenv("MODEL_BACKEND", "torch").lower()
+    EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_O3.onnx")
+    RE_RANKER_ONNX_FILE = os.getenv("RE_RANKER_ONNX_FILE", "onnx/model_qint8_avx512_vnni.onnx")
     OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1")
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", 4096))
+    OLLAMA_NUM_PREDICT = int(os.getenv("OLLAMA_NUM_PREDICT", 1024))
+    OLLAMA_WARM_UP_TIMEOUT = float(os.getenv("OLLAMA_WARM_UP_TIMEOUT", 120))
+    QUERY_MAX_SEQ_LENGTH = int(os.getenv("QUERY_MAX_SEQ_LENGTH", 64))
+    RE_RANKER_MAX_LENGTH = int(os.getenv("RE_RANKER_MAX_LENGTH", 256))
+    RE_RANKER_TORCH_COMPILE = os.getenv("RE_RANKER_TORCH_COMPILE", "false").lower() == "true"
+    TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", os.cpu_count() or 1))
+    RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", 256))
     K_INITIAL_RETRIEVAL = int(os.getenv("K_INITIAL_RETRIEVAL", 20))
     K_FINAL_RE_RANKED = int(os.getenv("K_FINAL_RE_RANKED", 15))
+    FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", 8))
+    FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", 48))
+    FAISS_PQ_NBITS = int(os.getenv("FAISS_PQ_NBITS", 8))
+    FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", 32))
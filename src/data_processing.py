@@ -1,84 +1,190 @@
-import json
+import contextlib
+import os
+import pickle
 import re
+import tempfile
 import logging
+import numpy as np
+import orjson
 from typing import List, Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-def parse_punishment_years(text_description: str) -> Tuple[Optional[int], str]:
+# Bump when the parsed record layout changes so stale pickle caches are re-parsed.
+_STRUCTURED_CACHE_VERSION = 3
+
+# Punishment/year patterns run on already-lowercased text, so they need no re.IGNORECASE.
+_PUNISHMENT_RE = re.compile(r'punishment:\s*(.*)')
+# Matches either a year range ("2 to 5 years") or a single duration ("7 years") in one scan.
+_YEARS_RE = re.compile(r'(?:(?P<low>\d+)\s*(?:to|-)\s*(?P<high>\d+)|(?P<single>\d+))\s*years?')
+_IPC_RE = re.compile(r'IPC\s*(\d+[A-Z]*)', re.IGNORECASE)
+_DESC_RE = re.compile(r'^[^:]*:(.*?)(?:Punishment:|$)', re.DOTALL)
+
+def parse_punishment_years(text_description: str, lower_text: Optional[str] = None) -> Tuple[Optional[int], str]:
     """
     Parses punishment years from a text description.
     
     Args:
         text_description: The text containing punishment details.
+        lower_text: Optional precomputed `text_description.lower()`.
     
     Returns:
         Tuple containing the number of years (or None) and the punishment text.
     """
-    years = None
+    if lower_text is None:
+        lower_text = text_description.lower()
     punishment_text = ""
+    punishment_lower = ""
     
-    punishment_match = re.search(r'Punishment:\s*(.*)', text_description, re.IGNORECASE)
+    punishment_match = _PUNISHMENT_RE.search(lower_text)
     if punishment_match:
-        punishment_text = punishment_match.group(1).strip()
+        start, end = punishment_match.span(1)
+        punishment_lower = lower_text[start:end].strip()
+        if len(lower_text) == len(text_description):
+            punishment_text = text_description[start:end].strip()
+        else:
+            # Lowercasing changed the string length (non-ASCII), so offsets do not map back.
+            punishment_text = re.search(r'Punishment:\s*(.*)', text_description, re.IGNORECASE).group(1).strip()
     
-    year_ranges = re.findall(r'(\d+)\s*(?:to|-)\s*(\d+)\s*(?:years|year)', punishment_text, re.IGNORECASE)
-    if year_ranges:
-        years = max(int(yr) for r in year_ranges for yr in r)
-    else:
-        year_matches = re.findall(r'(\d+)\s*(?:years|year)', punishment_text, re.IGNORECASE)
-        if year_matches:
-            years = int(year_matches[0])
+    # Any year range wins (largest bound across ranges); otherwise the first single duration.
+    range_max = None
+    first_single = None
+    for year_match in _YEARS_RE.finditer(punishment_lower):
+        if year_match.group('low') is not None:
+            range_bound = max(int(year_match.group('low')), int(year_match.group('high')))
+            range_max = range_bound if range_max is None else max(range_max, range_bound)
+        elif first_single is None:
+            first_single = int(year_match.group('single'))
+    years = range_max if range_max is not None else first_single
     
     if years is None:
-        if 'life' in punishment_text.lower():
+        if 'life' in punishment_lower:
             years = 999
-        elif 'death' in punishment_text.lower():
+        elif 'death' in punishment_lower:
             years = 1000
     
     return years, punishment_text
 
-def load_data_structured(file_path: str) -> List[Dict]:
+def _data_file_signature(file_path: str) -> Tuple[str, int, int]:
+    """Identifies a data file by absolute path, size and modification time."""
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns
+
+def _load_structured_cache(file_path: str, cache_path: str) -> Optional[List[Dict]]:
+    """Returns cached structured data if it was parsed from this exact data file by this parser version."""
+    try:
+        with open(cache_path, 'rb') as f:
+            cache_version, source_signature, structured_data = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable structured data cache {cache_path}: {e}")
+        return None
+    if cache_version != _STRUCTURED_CACHE_VERSION or source_signature != _data_file_signature(file_path):
+        return None
+    logger.info(f"Loaded {len(structured_data)} IPC sections from cache {cache_path}.")
+    return structured_data
+
+def _save_structured_cache(structured_data: List[Dict], source_signature: Tuple[str, int, int], cache_path: str) -> None:
+    """Atomically writes structured data, tagged with its source file signature, to the pickle cache."""
+    tmp_path = None
+    try:
+        # A unique temp file per writer, so concurrent cold starts never publish each other's partial writes.
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(cache_path) or '.', suffix='.tmp', delete=False) as f:
+            tmp_path = f.name
+            pickle.dump((_STRUCTURED_CACHE_VERSION, source_signature, structured_data), f, protocol=5)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not write structured data cache {cache_path}: {e}")
+        if tmp_path is not None:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+
+def load_data_structured(file_path: str, cache_path: Optional[str] = None) -> List[Dict]:
     """
     Loads and structures IPC data from a JSONL file.
     
     Args:
         file_path: Path to the JSONL file.
+        cache_path: Optional pickle cache, reused only while the JSONL file's path, size and mtime match.
     
     Returns:
         List of dictionaries containing structured IPC data.
     """
+    source_signature = None
+    if cache_path is not None:
+        try:
+            cached_data = _load_structured_cache(file_path, cache_path)
+            source_signature = _data_file_signature(file_path)
+        except FileNotFoundError:
+            logger.error(f"Data file {file_path} not found.")
+            raise
+        if cached_data is not None:
+            return cached_data
+
     structured_data = []
     skipped_count = 0
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
+        # orjson parses bytes directly, so the file is read in binary mode to skip decoding each line.
+        with open(file_path, 'rb') as f:
             for line in f:
                 try:
-                    entry = json.loads(line)
+                    entry = orjson.loads(line)
                     text_content = entry.get('text', '')
+                    lower_text = text_content.lower()
                     
-                    if "nan" in text_content.lower() or len(text_content) < 20:
+                    if "nan" in lower_text or len(text_content) < 20:
                         skipped_count += 1
                         continue
                     
-                    ipc_section_match = re.search(r'IPC\s*(\d+[A-Z]*)', text_content, re.IGNORECASE)
+                    ipc_section_match = _IPC_RE.search(text_content)
                     ipc_section_id = ipc_section_match.group(0).upper() if ipc_section_match else "UNKNOWN"
                     
-                    punishment_years, punishment_description_text = parse_punishment_years(text_content)
+                    punishment_years, punishment_description_text = parse_punishment_years(text_content, lower_text)
+                    description_match = _DESC_RE.match(text_content) if 'Punishment:' in text_content else None
                     
                     structured_data.append({
                         "ipc_section_id": ipc_section_id,
-                        "description_summary": text_content.split(':', 1)[1].split('Punishment:', 1)[0].strip() if 'Punishment:' in text_content else text_content,
+                        "description_summary": description_match.group(1).strip() if description_match else text_content,
                         "punishment_years": punishment_years,
-                        "original_text": text_content
+                        "original_text": text_content,
+                        "_has_child_minor": 'child' in lower_text or 'minor' in lower_text,
+                        "_section_key": f"ipc {ipc_section_match.group(1).lower()}" if ipc_section_match else "unknown"
                     })
-                except json.JSONDecodeError:
-                    logger.warning(f"Skipping invalid JSON line: {line.strip()}")
+                except orjson.JSONDecodeError:
+                    logger.warning(f"Skipping invalid JSON line: {line.decode('utf-8', 'replace').strip()}")
                 except Exception as e:
                     logger.warning(f"Error parsing line: {e}")
         logger.info(f"Loaded {len(structured_data)} IPC sections, skipped {skipped_count} invalid entries.")
     except FileNotFoundError:
         logger.error(f"Data file {file_path} not found.")
         raise
+    if cache_path is not None:
+        _save_structured_cache(structured_data, source_signature, cache_path)
     return structured_data
 
+
+def build_ipc_lookup(structured_data: List[Dict]) -> Dict:
+    """
+    Builds lookup tables over structured IPC data for fast retrieval-time filtering.
+    
+    Args:
+        structured_data: List of structured IPC data from load_data_structured.
+    
+    Returns:
+        Dictionary with "punishment_years" (int32, -1 where unknown) and "original_texts"
+        (object) arrays aligned with structured_data, and a "section_to_idx" map from
+        lowercased section id (e.g. "ipc 302") to index. Indices double as FAISS ids,
+        since the index is rebuilt whenever its metadata diverges from structured_data.
+    """
+    punishment_years = np.array(
+        [-1 if item["punishment_years"] is None else item["punishment_years"] for item in structured_data],
+        dtype=np.int32
+    )
+    original_texts = np.empty(len(structured_data), dtype=object)
+    original_texts[:] = [item["original_text"] for item in structured_data]
+    section_to_idx = {}
+    for idx, item in enumerate(structured_data):
+        if item["ipc_section_id"] != "UNKNOWN":
+            section_to_idx.setdefault(item["_section_key"], idx)
+    return {"punishment_years": punishment_years, "original_texts": original_texts, "section_to_idx": section_to_idx}
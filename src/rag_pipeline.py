@@ -1,17 +1,52 @@
+from __future__ import annotations
+
 import streamlit as st
-import faiss
 import numpy as np
 import ollama
-from sentence_transformers import SentenceTransformer, CrossEncoder
+import itertools
 import json
+import math
 import os
+import re
 import logging
-from typing import List, Tuple, Optional, Dict
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, List, Tuple, Optional, Dict
 from src.config import Config
 from src.utils import parse_punishment_years
 
+# faiss, torch and sentence-transformers take seconds to import, so they are imported
+# inside the functions that need them rather than when Streamlit loads this module.
+if TYPE_CHECKING:
+    import faiss
+    from sentence_transformers import SentenceTransformer, CrossEncoder
+
 logger = logging.getLogger(__name__)
 
+RE_RANK_LENGTH_BUCKETS = (64, 128, 256, 512)
+
+# Fixed instructions are sent as the system message so Ollama can reuse its KV cache across queries.
+_SYSTEM_PROMPT = """You are an expert, helpful, and informative legal assistant specializing in the Indian Penal Code (IPC).
+Your main goal is to **explain IPC concepts and punishments in very simple and easy-to-understand language**, as if you are explaining to a 10-year-old.
+Where possible, avoid complex legal jargon. If absolutely necessary, explain such terms concisely.
+
+**You must answer ONLY based on the IPC sections provided in the user's message.**
+**Your absolute top priority is to list every single IPC section and its punishment that matches the user's criteria.** Do not omit any relevant section from the provided context.
+For each relevant section, clearly state its **number, name (title), and punishment**.
+**Elaborate slightly on the answer, explaining each section a bit more, to ensure the user understands better.**
+If the provided sections do not contain enough information to fully answer the query, clearly state that you do not have specific details based on the information given. Do not create any information on your own (do not hallucinate)."""
+
+# Query encoding / FAISS search only; Ollama warm-ups get their own worker so a slow
+# model load can never queue retrieval work behind it.
+_background_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag")
+_warm_up_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ollama-warm-up")
+_warm_up_lock = threading.Lock()
+_warm_up_future: Optional[Future] = None
+
+_GT_YEARS_RE = re.compile(r'greater than (\d+)\s*(?:years|year)?', re.IGNORECASE)
+_IPC_RE = re.compile(r'IPC\s*(\d+[A-Z]*)', re.IGNORECASE)
+
 def get_embeddings(texts: List[str], model_name: str) -> Tuple[np.ndarray, int]:
     """
     Generates embeddings for a list of texts using a pre-trained SBERT model.
@@ -23,18 +58,37 @@ def get_embeddings(texts: List[str], model_name: str) -> Tuple[np.ndarray, int]:
     Returns:
         Tuple of embeddings (numpy array) and embedding dimension.
     """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
     try:
-        model = SentenceTransformer(model_name)
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        model_kwargs = {"torch_dtype": torch.float16} if device == "cuda" else {}
+        model = SentenceTransformer(model_name, device=device, model_kwargs=model_kwargs)
+        # Encode in length order so each batch pads to a similar length, then restore input order.
+        order = np.argsort([len(text) for text in texts], kind="stable")
         with st.spinner("Generating embeddings..."):
-            embeddings = model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
+            sorted_embeddings = model.encode(
+                [texts[i] for i in order],
+                batch_size=256 if device == "cuda" else 64,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+        embeddings = np.empty_like(sorted_embeddings, dtype=np.float32)
+        embeddings[order] = sorted_embeddings
         return embeddings, model.get_sentence_embedding_dimension()
     except Exception as e:
         logger.error(f"Error generating embeddings: {e}")
         raise
 
-def build_and_save_faiss_index(embeddings: np.ndarray, texts: List[str], embedding_dimension: int, index_path: str, metadata_path: str) -> faiss.IndexFlatL2:
+def build_and_save_faiss_index(embeddings: np.ndarray, texts: List[str], embedding_dimension: int, index_path: str, metadata_path: str) -> faiss.Index:
     """
     Builds and saves a FAISS index along with metadata.
+
+    Embeddings are L2-normalized and searched by inner product (cosine similarity).
+    Large corpora get an IVF-PQ index; corpora too small to train the PQ
+    codebooks fall back to an HNSW graph over the raw vectors.
     
     Args:
         embeddings: Numpy array of embeddings.
@@ -46,8 +100,23 @@ def build_and_save_faiss_index(embeddings: np.ndarray, texts: List[str], embeddi
     Returns:
         FAISS index object.
     """
+    import faiss
+
     try:
-        index = faiss.IndexFlatL2(embedding_dimension)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        faiss.normalize_L2(embeddings)
+        num_vectors = embeddings.shape[0]
+        # PQ codebooks need ~39 training points per centroid (2**nbits centroids).
+        if num_vectors >= 39 * (1 << Config.FAISS_PQ_NBITS):
+            nlist = min(256, int(4 * math.sqrt(num_vectors)))
+            quantizer = faiss.IndexFlatIP(embedding_dimension)
+            index = faiss.IndexIVFPQ(
+                quantizer, embedding_dimension, nlist, Config.FAISS_PQ_M, Config.FAISS_PQ_NBITS, faiss.METRIC_INNER_PRODUCT
+            )
+            index.train(embeddings)
+            index.nprobe = Config.FAISS_NPROBE
+        else:
+            index = faiss.IndexHNSWFlat(embedding_dimension, Config.FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT)
         index.add(embeddings)
         faiss.write_index(index, index_path)
         with open(metadata_path, 'w', encoding='utf-8') as f:
@@ -58,7 +127,7 @@ def build_and_save_faiss_index(embeddings: np.ndarray, texts: List[str], embeddi
         logger.error(f"Error building FAISS index: {e}")
         raise
 
-def load_faiss_index_and_metadata(index_path: str, metadata_path: str) -> Tuple[faiss.IndexFlatL2, List[str]]:
+def load_faiss_index_and_metadata(index_path: str, metadata_path: str) -> Tuple[faiss.Index, List[str]]:
     """
     Loads a FAISS index and its corresponding metadata.
     
@@ -69,6 +138,8 @@ def load_faiss_index_and_metadata(index_path: str, metadata_path: str) -> Tuple[
     Returns:
         Tuple of FAISS index and metadata list.
     """
+    import faiss
+
     try:
         index = faiss.read_index(index_path)
         with open(metadata_path, 'r', encoding='utf-8') as f:
@@ -82,115 +153,376 @@ def load_faiss_index_and_metadata(index_path: str, metadata_path: str) -> Tuple[
         logger.error(f"Error loading FAISS index or metadata: {e}")
         raise
 
+def load_query_encoder(model_name: str) -> SentenceTransformer:
+    """
+    Loads the SentenceTransformer used to encode user queries.
+
+    Args:
+        model_name: Name of the SentenceTransformer model.
+
+    Returns:
+        SentenceTransformer pinned to GPU in fp16 when available, otherwise CPU.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if Config.MODEL_BACKEND == "onnx":
+        model = SentenceTransformer(
+            model_name,
+            backend="onnx",
+            model_kwargs={"file_name": Config.EMBEDDING_ONNX_FILE, "provider": "CPUExecutionProvider"}
+        )
+    else:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        torch_dtype = torch.float16 if device == "cuda" else torch.float32
+        model = SentenceTransformer(model_name, device=device, model_kwargs={"torch_dtype": torch_dtype})
+    model.max_seq_length = Config.QUERY_MAX_SEQ_LENGTH
+    return model
+
+def load_re_ranker(model_name: str) -> CrossEncoder:
+    """
+    Loads the CrossEncoder used to re-rank retrieved sections.
+
+    Args:
+        model_name: Name of the CrossEncoder model.
+
+    Returns:
+        CrossEncoder running on ONNX Runtime (INT8 quantized) or PyTorch, per Config.MODEL_BACKEND.
+    """
+    import torch
+    from sentence_transformers import CrossEncoder
+
+    if Config.MODEL_BACKEND == "onnx":
+        model = CrossEncoder(
+            model_name,
+            backend="onnx",
+            model_kwargs={"file_name": Config.RE_RANKER_ONNX_FILE, "provider": "CPUExecutionProvider"}
+        )
+    else:
+        model = CrossEncoder(model_name)
+        if Config.RE_RANKER_TORCH_COMPILE:
+            compile_mode = "reduce-overhead" if torch.cuda.is_available() else "default"
+            model.model = torch.compile(model.model, mode=compile_mode)
+    model.max_length = Config.RE_RANKER_MAX_LENGTH
+    return model
+
+def re_rank_scores(query: str, documents: List[str], re_ranker_model: CrossEncoder) -> np.ndarray:
+    """
+    Scores (query, document) pairs with the CrossEncoder, batching pairs of similar length together.
+
+    Pairs are grouped into RE_RANK_LENGTH_BUCKETS by token count so that a single long
+    section does not force every pair in the batch to be padded to its length.
+
+    Args:
+        query: User query string.
+        documents: Candidate IPC section texts.
+        re_ranker_model: CrossEncoder model for re-ranking.
+
+    Returns:
+        Numpy array of scores aligned with `documents`.
+    """
+    scores = np.zeros(len(documents), dtype=np.float32)
+    if not documents:
+        return scores
+    tokenizer = re_ranker_model.tokenizer
+    query_length = len(tokenizer.tokenize(query))
+    document_lengths = tokenizer(documents, add_special_tokens=False, return_length=True)["length"]
+
+    # Pairs are truncated to max_length, so buckets above it would only add extra predict calls.
+    max_length = re_ranker_model.max_length or RE_RANK_LENGTH_BUCKETS[-1]
+    buckets: Dict[int, List[int]] = {}
+    for i, document_length in enumerate(document_lengths):
+        pair_length = query_length + document_length + 3
+        bucket = next((b for b in RE_RANK_LENGTH_BUCKETS if pair_length <= b), RE_RANK_LENGTH_BUCKETS[-1])
+        bucket = min(bucket, max_length)
+        buckets.setdefault(bucket, []).append(i)
+
+    import torch
+
+    # CrossEncoder.predict already runs under torch.inference_mode in sentence-transformers 4.1+.
+    for bucket_indices in buckets.values():
+        bucket_pairs = [[query, documents[i]] for i in bucket_indices]
+        scores[bucket_indices] = re_ranker_model.predict(
+            bucket_pairs,
+            batch_size=32,
+            activation_fn=torch.nn.Identity()  # Raw logits are enough for ranking, so skip the sigmoid.
+        )
+    return scores
+
+def configure_torch_threads() -> None:
+    """Uses all CPU cores for intra-op parallelism in PyTorch matmuls."""
+    import torch
+
+    torch.set_num_threads(Config.TORCH_NUM_THREADS)
+    try:
+        torch.set_num_interop_threads(2)
+    except RuntimeError:
+        # Inter-op threads can only be set before PyTorch starts any parallel work.
+        logger.debug("PyTorch inter-op thread count was already fixed; leaving it unchanged.")
+
 @st.cache_resource
 def initialize_rag_components():
     """Initializes RAG components (data, index, models)."""
-    from src.data_processing import load_data_structured
-    structured_ipc_data = load_data_structured(Config.DATA_FILE)
+    import faiss
+    from src.data_processing import load_data_structured, build_ipc_lookup
+    configure_torch_threads()
+    structured_ipc_data = load_data_structured(Config.DATA_FILE, Config.STRUCTURED_DATA_CACHE_PATH)
+    ipc_lookup = build_ipc_lookup(structured_ipc_data)
     ipc_data_for_embeddings = [item["original_text"] for item in structured_ipc_data]
 
-    if not os.path.exists(Config.VECTOR_DB_PATH) or not os.path.exists(Config.METADATA_PATH):
+    ipc_faiss_index, ipc_metadata = None, None
+    if os.path.exists(Config.VECTOR_DB_PATH) and os.path.exists(Config.METADATA_PATH):
+        ipc_faiss_index, ipc_metadata = load_faiss_index_and_metadata(Config.VECTOR_DB_PATH, Config.METADATA_PATH)
+        # FAISS ids must line up with structured_ipc_data positions for filtered search.
+        if ipc_metadata != ipc_data_for_embeddings:
+            logger.info("FAISS metadata is out of date with the data file; rebuilding the index.")
+            ipc_faiss_index = None
+        elif ipc_faiss_index.metric_type != faiss.METRIC_INNER_PRODUCT:
+            logger.info("FAISS index was built with an L2 metric; rebuilding it for inner-product search.")
+            ipc_faiss_index = None
+
+    if ipc_faiss_index is None:
         ipc_embeddings, embedding_dim = get_embeddings(ipc_data_for_embeddings, Config.EMBEDDING_MODEL_NAME)
         ipc_faiss_index = build_and_save_faiss_index(
             ipc_embeddings, ipc_data_for_embeddings, embedding_dim, Config.VECTOR_DB_PATH, Config.METADATA_PATH
         )
         ipc_metadata = ipc_data_for_embeddings
-    else:
-        ipc_faiss_index, ipc_metadata = load_faiss_index_and_metadata(Config.VECTOR_DB_PATH, Config.METADATA_PATH)
         
-    retrieval_model = SentenceTransformer(Config.EMBEDDING_MODEL_NAME)
-    re_ranker_model = CrossEncoder(Config.RE_RANKER_MODEL_NAME)
+    retrieval_model = load_query_encoder(Config.EMBEDDING_MODEL_NAME)
     
-    return structured_ipc_data, ipc_faiss_index, ipc_metadata, retrieval_model, re_ranker_model
+    # The re-ranker is returned as a getter so queries that skip re-ranking never load it.
+    return structured_ipc_data, ipc_lookup, ipc_faiss_index, ipc_metadata, retrieval_model, get_re_ranker
+
+@st.cache_resource
+def get_re_ranker() -> CrossEncoder:
+    """Loads the CrossEncoder re-ranker on first use."""
+    return load_re_ranker(Config.RE_RANKER_MODEL_NAME)
+
+def encode_query(embedding_model: SentenceTransformer, query: str) -> np.ndarray:
+    """
+    Encodes a single query into a normalized (1, d) float32 array for FAISS search.
+    
+    Args:
+        embedding_model: SentenceTransformer model for embeddings.
+        query: User query string.
+    
+    Returns:
+        Query embedding of shape (1, d).
+    """
+    return np.frombuffer(_encode_query_bytes(embedding_model, query), dtype=np.float32)[None, :]
+
+@lru_cache(maxsize=512)
+def _encode_query_bytes(embedding_model: SentenceTransformer, query: str) -> bytes:
+    # Cached as bytes because numpy arrays are mutable; the model is hashed by identity.
+    return embedding_model.encode(query, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32).tobytes()
+
+def search_faiss_index(faiss_index: faiss.Index, query_embedding: np.ndarray, k: int, allowed_ids: Optional[np.ndarray] = None) -> List[int]:
+    """
+    Searches the FAISS index, optionally restricted to a subset of ids.
+    
+    Args:
+        faiss_index: FAISS index for semantic search.
+        query_embedding: Query embedding of shape (1, d).
+        k: Number of neighbours to return.
+        allowed_ids: Optional ids the search is restricted to.
+    
+    Returns:
+        List of matching ids, nearest first.
+    """
+    import faiss
+
+    selector = faiss.IDSelectorBatch(np.asarray(allowed_ids, dtype=np.int64)) if allowed_ids is not None else None
+    # A restrictive selector leaves few allowed ids in the probed lists / visited graph nodes,
+    # so filtered searches probe every IVF list and widen the HNSW beam (capped, since callers
+    # top up any shortfall and a beam the size of a broad filter would walk the whole graph).
+    if isinstance(faiss_index, faiss.IndexIVF):
+        nprobe = faiss_index.nlist if selector is not None else Config.FAISS_NPROBE
+        params = faiss.SearchParametersIVF(nprobe=nprobe, sel=selector)
+    elif isinstance(faiss_index, faiss.IndexHNSW):
+        ef_search = faiss_index.hnsw.efSearch
+        if selector is not None:
+            ef_search = max(k, min(len(allowed_ids), max(ef_search, 4 * k)))
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    _, indices = faiss_index.search(query_embedding, k, params=params)
+    return [int(idx) for idx in indices[0] if idx >= 0]
 
 def retrieve_relevant_ipc_hybrid(
     query: str,
     structured_ipc_data: List[Dict],
-    faiss_index: faiss.IndexFlatL2,
+    ipc_lookup: Dict,
+    faiss_index: faiss.Index,
     metadata: List[str],
     embedding_model: SentenceTransformer,
-    re_ranker_model: CrossEncoder,
+    get_re_ranker: Callable[[], CrossEncoder],
     k_initial: int,
     k_final: int
 ) -> List[str]:
     """
     Retrieves relevant IPC sections using a hybrid approach.
+    Results are cached per whitespace-trimmed, lowercased query.
     
     Args:
         query: User query string.
-        signed_ipc_data: List of structured IPC data.
+        structured_ipc_data: List of structured IPC data.
+        ipc_lookup: Lookup tables from build_ipc_lookup.
         faiss_index: FAISS index for semantic search.
         metadata: Metadata associated with FAISS index.
         embedding_model: SentenceTransformer model for embeddings.
-        re_ranker_model: CrossEncoder model for re-ranking.
+        get_re_ranker: Returns the CrossEncoder model for re-ranking, loading it on first use.
         k_initial: Number of initial documents to retrieve.
         k_final: Number of final documents after re-ranking.
     
     Returns:
         List of relevant IPC section texts.
     """
-    import re
+    return list(_retrieve_cached(
+        _normalize_query(query), k_initial, k_final, query.strip(),
+        structured_ipc_data, ipc_lookup, faiss_index, metadata, embedding_model, get_re_ranker
+    ))
+
+@st.cache_data(max_entries=Config.RETRIEVAL_CACHE_SIZE, show_spinner=False)
+def _retrieve_cached(
+    normalized_query: str,
+    k_initial: int,
+    k_final: int,
+    _query: str,
+    _structured_ipc_data: List[Dict],
+    _ipc_lookup: Dict,
+    _faiss_index: faiss.Index,
+    _metadata: List[str],
+    _embedding_model: SentenceTransformer,
+    _get_re_ranker: Callable[[], CrossEncoder]
+) -> List[str]:
+    """
+    Caches retrieval results per normalized query; underscored arguments are not hashed.
+    The models see the original (stripped) query, since they may be case-sensitive.
+    """
+    return _retrieve_relevant_ipc_hybrid(
+        _query, _structured_ipc_data, _ipc_lookup, _faiss_index, _metadata,
+        _embedding_model, _get_re_ranker, k_initial, k_final
+    )
+
+def _retrieve_relevant_ipc_hybrid(
+    query: str,
+    structured_ipc_data: List[Dict],
+    ipc_lookup: Dict,
+    faiss_index: faiss.Index,
+    metadata: List[str],
+    embedding_model: SentenceTransformer,
+    get_re_ranker: Callable[[], CrossEncoder],
+    k_initial: int,
+    k_final: int
+) -> List[str]:
     min_years_threshold = None
-    punishment_years_filter_match = re.search(r'greater than (\d+)\s*(?:years|year)?', query, re.IGNORECASE)
+    punishment_years_filter_match = _GT_YEARS_RE.search(query)
     if punishment_years_filter_match:
         min_years_threshold = int(punishment_years_filter_match.group(1))
         st.info(f"Applying numerical filter: Punishment greater than {min_years_threshold} years.")
-        filtered_by_condition = [
-            item["original_text"] for item in structured_ipc_data
-            if item["punishment_years"] is not None and item["punishment_years"] > min_years_threshold
-        ]
+        filtered_indices = np.flatnonzero(ipc_lookup["punishment_years"] > min_years_threshold)
+        filtered_by_condition = ipc_lookup["original_texts"][filtered_indices].tolist()
         if filtered_by_condition:
-            sentence_pairs = [[query, doc] for doc in filtered_by_condition]
-            if sentence_pairs:
-                rerank_scores = re_ranker_model.predict(sentence_pairs)
-                scored_documents = sorted(list(zip(filtered_by_condition, rerank_scores)), key=lambda x: x[1], reverse=True)
-                return [doc for doc, score in scored_documents[:20]]
-            return []
+            if len(filtered_by_condition) > k_initial:
+                # Cheap semantic prefilter so the cross-encoder only sees k_initial candidates.
+                query_embedding = encode_query(embedding_model, query)
+                candidate_indices = search_faiss_index(faiss_index, query_embedding, k_initial, allowed_ids=filtered_indices)
+                if len(candidate_indices) < k_initial:
+                    # Filtered ANN search can come back short; top up with the remaining filtered sections.
+                    found = set(candidate_indices)
+                    candidate_indices += [int(idx) for idx in filtered_indices if idx not in found][:k_initial - len(candidate_indices)]
+                filtered_by_condition = [metadata[idx] for idx in candidate_indices]
+            rerank_scores = re_rank_scores(query, filtered_by_condition, get_re_ranker())
+            scored_documents = sorted(list(zip(filtered_by_condition, rerank_scores)), key=lambda x: x[1], reverse=True)
+            return [doc for doc, _ in scored_documents[:k_final]]
         st.warning("Numerical filter applied but found no matching sections. Falling back to general search.")
 
+    # Semantic search runs in the background (encoding and FAISS search release the GIL)
+    # while the keyword and exact-section matching below run on this thread.
+    semantic_future = _background_executor.submit(
+        lambda: search_faiss_index(faiss_index, encode_query(embedding_model, query), k_initial)
+    )
+
     retrieved_sections = []
     query_lower = query.lower()
     
     # Keyword matching
     keyword_matches = []
     if 'child' in query_lower or 'minor' in query_lower:
-        for item in structured_ipc_data:
-            if 'child' in item["original_text"].lower() or 'minor' in item["original_text"].lower():
-                keyword_matches.append(item["original_text"])
+        keyword_matches = [item["original_text"] for item in structured_ipc_data if item["_has_child_minor"]]
 
     # Exact IPC section match
-    match = re.search(r'IPC\s*(\d+[A-Z]*)', query, re.IGNORECASE)
+    match = _IPC_RE.search(query)
     if match:
-        section_id_query = f"IPC {match.group(1).upper()}"
-        for section_text in metadata:
-            if section_text.lower().startswith(section_id_query.lower()):
-                retrieved_sections.append(section_text)
-                break
-    
-    # Semantic search
-    query_embedding = embedding_model.encode([query], convert_to_numpy=True)
-    distances, indices = faiss_index.search(query_embedding, k_initial)
-    
-    semantic_matches = []
-    for i, idx in enumerate(indices[0]):
-        if 0 <= idx < len(metadata):
-            semantic_matches.append(metadata[idx])
-            
-    combined_results_for_reranking = []
-    seen = set()
-    for item in keyword_matches + retrieved_sections + semantic_matches:
-        if item not in seen:
-            combined_results_for_reranking.append(item)
-            seen.add(item)
-
-    if not combined_results_for_reranking:
-        return []
-
-    sentence_pairs = [[query, doc] for doc in combined_results_for_reranking]
-    rerank_scores = re_ranker_model.predict(sentence_pairs)
+        section_idx = ipc_lookup["section_to_idx"].get(f"ipc {match.group(1).lower()}")
+        if section_idx is not None:
+            retrieved_sections.append(metadata[section_idx])
+    
+    semantic_matches = [metadata[idx] for idx in semantic_future.result() if idx < len(metadata)]
+
+    combined_results_for_reranking = list(dict.fromkeys(itertools.chain(keyword_matches, retrieved_sections, semantic_matches)))
+
+    # Re-ranking cannot change which documents are returned, or the query names a section
+    # directly and semantic neighbours are already in similarity order: skip the cross-encoder.
+    if len(combined_results_for_reranking) <= k_final:
+        return combined_results_for_reranking
+    if retrieved_sections and not keyword_matches:
+        return combined_results_for_reranking[:k_final]
+
+    rerank_scores = re_rank_scores(query, combined_results_for_reranking, get_re_ranker())
     scored_documents = sorted(list(zip(combined_results_for_reranking, rerank_scores)), key=lambda x: x[1], reverse=True)
     return [doc for doc, score in scored_documents[:k_final]]
 
+def _ollama_options() -> Dict:
+    # Warm-up and chat must send identical runner options (num_ctx in particular),
+    # otherwise Ollama reloads the model between the two requests.
+    return {'temperature': 0.3, 'num_ctx': Config.OLLAMA_NUM_CTX, 'num_predict': Config.OLLAMA_NUM_PREDICT}
+
+def _normalize_query(query: str) -> str:
+    return query.strip().lower()
+
+def has_cached_answer(query: str, ollama_model: str) -> bool:
+    """
+    Checks whether this session already holds an answer for the query.
+    
+    Args:
+        query: User query string.
+        ollama_model: Name of the Ollama model.
+    
+    Returns:
+        True if generate_answer_with_ollama will replay a cached answer instead of calling Ollama.
+    """
+    normalized_query = _normalize_query(query)
+    answer_cache = st.session_state.get("answer_cache", {})
+    return any(model == ollama_model and cached_query == normalized_query for model, cached_query, _ in answer_cache)
+
+def start_ollama_warm_up(ollama_model: str) -> Future:
+    """
+    Asks Ollama to load the model in the background so it is ready once retrieval finishes.
+    
+    Args:
+        ollama_model: Name of the Ollama model.
+    
+    Returns:
+        Future that completes when the model is loaded (or the request fails). If a warm-up
+        is already in flight, its future is returned instead of queueing another one.
+    """
+    global _warm_up_future
+
+    def warm_up():
+        try:
+            # A chat request with no messages only loads the model into memory.
+            client = ollama.Client(timeout=Config.OLLAMA_WARM_UP_TIMEOUT)
+            client.chat(model=ollama_model, messages=[], options=_ollama_options(), keep_alive=Config.OLLAMA_KEEP_ALIVE)
+        except Exception as e:
+            # The real chat call reports connection/model errors to the user.
+            logger.warning(f"Ollama warm-up failed: {e}")
+
+    with _warm_up_lock:
+        if _warm_up_future is None or _warm_up_future.done():
+            _warm_up_future = _warm_up_executor.submit(warm_up)
+        return _warm_up_future
+
 def generate_answer_with_ollama(query: str, retrieved_ipc_sections: List[str], ollama_model: str) -> str:
     """
     Generates an answer using Ollama LLM based on retrieved IPC sections.
@@ -206,38 +538,31 @@ def generate_answer_with_ollama(query: str, retrieved_ipc_sections: List[str], o
     if not retrieved_ipc_sections:
         return "Mujhe aapki query ke liye apne database mein koi relevant IPC section nahi mila. Kya aap kripya ise doosre tarike se poochh sakte hain ya aur details de sakte hain?"
 
-    context = "\n".join(retrieved_ipc_sections)
-    prompt = f"""
-    You are an expert, helpful, and informative legal assistant specializing in the Indian Penal Code (IPC).
-    Your main goal is to **explain IPC concepts and punishments in very simple and easy-to-understand language**, as if you are explaining to a 10-year-old.
-    Where possible, avoid complex legal jargon. If absolutely necessary, explain such terms concisely.
-
-    **You must answer ONLY based on the IPC sections provided below.**
-    **Your absolute top priority is to list every single IPC section and its punishment that matches the user's criteria.** Do not omit any relevant section from the provided context.
-    For each relevant section, clearly state its **number, name (title), and punishment**.
-    **Elaborate slightly on the answer, explaining each section a bit more, to ensure the user understands better.**
-    If the provided sections do not contain enough information to fully answer the query, clearly state that you do not have specific details based on the information given. Do not create any information on your own (do not hallucinate).
-
-    IPC Sections:
-    {context}
+    answer_cache = st.session_state.setdefault("answer_cache", {})
+    cache_key = (ollama_model, _normalize_query(query), tuple(retrieved_ipc_sections))
+    if cache_key in answer_cache:
+        st.markdown(answer_cache[cache_key])
+        return answer_cache[cache_key]
 
-    User Query: {query}
-
-    Answer:
-    """
+    context = "\n".join(retrieved_ipc_sections)
     try:
         full_response_content = ""
         response_placeholder = st.empty()
         stream = ollama.chat(
             model=ollama_model,
-            messages=[{'role': 'user', 'content': prompt}],
-            options={'temperature': 0.3},
+            messages=[
+                {'role': 'system', 'content': _SYSTEM_PROMPT},
+                {'role': 'user', 'content': f"IPC Sections:\n{context}\n\nUser Query: {query}"}
+            ],
+            options=_ollama_options(),
+            keep_alive=Config.OLLAMA_KEEP_ALIVE,
             stream=True
         )
         for chunk in stream:
             if 'content' in chunk['message']:
                 full_response_content += chunk['message']['content']
                 response_placeholder.markdown(full_response_content)
+        answer_cache[cache_key] = full_response_content
         return full_response_content
     except ollama.ResponseError as e:
         logger.error(f"Ollama error: {e}")